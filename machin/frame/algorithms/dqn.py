@@ -321,10 +321,31 @@ edu/class/psych209/Readings/MnihEtAlHassibis15NatureControlDeepRL.pdf>`__ essay.
         else:
             return safe_call(self.qnet, state)[0]
 
-    def store_transition(self, transition: Union[Transition, Dict]):
+    def store_transition(self, transition: Union[Transition, Dict] = None, **kwargs):
         """
         Add a transition sample to the replay buffer.
+
+        Attributes of the transition sample could also be passed as keyword
+        arguments instead of a dict, E.g.:
+        ``store_transition(state=..., action=..., next_state=..., reward=...,
+        terminal=...)``.
+
+        Args:
+            transition: A transition sample.
+            **kwargs: Attributes of the transition sample, only if
+                ``transition`` is not given.
+
+        Raises:
+            ``ValueError`` if both ``transition`` and keyword arguments
+            are given.
         """
+        if transition is None:
+            transition = Transition(**kwargs)
+        elif kwargs:
+            raise ValueError(
+                "Transition attributes must be given either as the transition "
+                "object or as keyword arguments, not both"
+            )
         self.replay_buffer.append(
             transition,
             required_attrs=("state", "action", "reward", "next_state", "terminal"),
@@ -334,11 +355,10 @@ edu/class/psych209/Readings/MnihEtAlHassibis15NatureControlDeepRL.pdf>`__ essay.
         """
         Add a full episode of transition samples to the replay buffer.
         """
-        for trans in episode:
-            self.replay_buffer.append(
-                trans,
-                required_attrs=("state", "action", "reward", "next_state", "terminal"),
-            )
+        self.replay_buffer.append_many(
+            episode,
+            required_attrs=("state", "action", "reward", "next_state", "terminal"),
+        )
 
     def update(
         self, update_value=True, update_target=True, concatenate_samples=True, **__
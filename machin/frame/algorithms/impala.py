@@ -45,7 +45,9 @@ def _make_tensor_from_batch(batch: List[Any], device, concatenate):
         item = batch[0]
         batch_size = len(batch)
         if t.is_tensor(item):
-            return t.cat([it.to(device) for it in batch], dim=0).to(device)
+            if all(it.device == item.device for it in batch):
+                return t.cat(batch, dim=0).to(device)
+            return t.cat([it.to(device) for it in batch], dim=0)
         else:
             return t.tensor(batch, device=device).view(batch_size, -1)
     else:
@@ -85,7 +87,7 @@ class EpisodeDistributedBuffer(DistributedBuffer):
         ),
     ):
         transition = EpisodeTransition(**transition)
-        super().append(transition, required_attrs=required_attrs)
+        return super().append(transition, required_attrs=required_attrs)
 
 
 class IMPALA(TorchFramework):
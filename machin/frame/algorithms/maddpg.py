@@ -21,7 +21,7 @@ class SHMBuffer(Buffer):
             item = batch[0]
             batch_size = len(batch)
             if t.is_tensor(item):
-                batch = [it.to(device) for it in batch]
+                # stored tensors are on the same device, transfer once
                 result = t.cat(batch, dim=0).to(device)
                 result.share_memory_()
                 return result
@@ -280,11 +280,10 @@ class SAC(TorchFramework):
         """
         Add a full episode of transition samples to the replay buffer.
         """
-        for trans in episode:
-            self.replay_buffer.append(
-                trans,
-                required_attrs=("state", "action", "next_state", "reward", "terminal"),
-            )
+        self.replay_buffer.append_many(
+            episode,
+            required_attrs=("state", "action", "next_state", "reward", "terminal"),
+        )
 
     def update(
         self,
@@ -1,17 +1,34 @@
 from typing import Union, Dict, List, Tuple, Any, Callable
+from threading import RLock
+from concurrent.futures import ThreadPoolExecutor, Future
 from ..transition import (
     TransitionBase,
     Transition,
     Scalar,
-    TransitionStorageSmart,
+    TransitionStorageColumnar,
+    # TransitionStorageSmart,
     # TransitionStorageBasic,
 )
 import torch as t
+import numpy as np
 import random
 
 
+def _is_cuda(device: Union[str, t.device, None]) -> bool:
+    return device is not None and t.device(device).type == "cuda"
+
+
+def _to_device(tensor: t.Tensor, device: Union[str, t.device, None]) -> t.Tensor:
+    """
+    Move a tensor to device. Only copies to cuda devices are non-blocking,
+    because a non-blocking copy to host memory may be read before it has
+    finished.
+    """
+    return tensor.to(device, non_blocking=_is_cuda(device))
+
+
 class Buffer:
-    def __init__(self, buffer_size, buffer_device="cpu", *_, **__):
+    def __init__(self, buffer_size, buffer_device="cpu", *_, pin_memory=False, **__):
         """
         Create a buffer instance.
 
@@ -21,6 +38,8 @@ class Buffer:
         See Also:
             :class:`.Transition`
 
+            :class:`.TransitionStorageColumnar`
+
 
         During sampling, the tensors in "state", "action" and "next_state"
         dictionaries, along with "reward", will be concatenated in dimension 0.
@@ -30,11 +49,43 @@ class Buffer:
         Args:
             buffer_size: Maximum buffer size.
             buffer_device: Device where buffer is stored.
+            pin_memory: Whether to gather samples into pinned memory when
+                buffer is stored in "cpu" and samples are copied to a cuda
+                device, so that the copy is asynchronous. Disabled by default
+                since pinned memory is page-locked and cannot be swapped.
         """
         self.buffer_size = buffer_size
         self.buffer_device = buffer_device
-        self.buffer = TransitionStorageSmart(buffer_size)
-        self.index = 0
+        self.pin_memory = pin_memory
+        self.buffer = TransitionStorageColumnar(
+            buffer_size, buffer_device, pin_memory=pin_memory
+        )
+        # all stored transitions share the same attributes, cached
+        # on the first append, see make_schema
+        self._schema = None
+        # required attributes already checked against the schema
+        self._checked_required_attrs = None
+        # make_tensor_from_batch overridden by subclasses must be used
+        # for all attributes, so columns are not gathered directly
+        self._gather_columns = (
+            type(self).make_tensor_from_batch is Buffer.make_tensor_from_batch
+        )
+        # resolve default sample methods once instead of on every sample
+        self._sample_methods = {}
+        for name in dir(self):
+            if not name.startswith("sample_index_"):
+                continue
+            method_name = name[len("sample_index_") :]
+            legacy_name = "sample_method_" + method_name
+            # sample_method_<name> overridden by subclasses takes priority
+            if getattr(type(self), legacy_name, None) is getattr(
+                Buffer, legacy_name, None
+            ):
+                self._sample_methods[method_name] = getattr(self, name)
+        # guards storage against samples taken by the background thread
+        # of sample_batch_async, the thread is created on first use
+        self._lock = RLock()
+        self._executor = None
 
     def append(
         self,
@@ -58,6 +109,60 @@ class Buffer:
             ``ValueError`` if transition object doesn't have required
             attributes in ``required_attrs`` or has different attributes
             compared to other transition objects stored in buffer.
+
+        Warnings:
+            Once the first transition is stored, attributes of following
+            transitions are compared with it only if ``__debug__`` is true,
+            i.e.: python is not started with the ``-O`` flag.
+        """
+        with self._lock:
+            return self.buffer.store(self._prepare(transition, required_attrs))
+
+    def append_many(
+        self,
+        transitions: List[Union[TransitionBase, Dict]],
+        required_attrs=("state", "action", "next_state", "reward", "terminal"),
+    ) -> List[int]:
+        """
+        Store a list of transition objects, such as a whole episode, to
+        buffer. Equivalent to calling :meth:`.Buffer.append` on every
+        transition, but data are copied into storage columns block by block
+        instead of transition by transition.
+
+        Note:
+            Subclasses overriding :meth:`.Buffer.append` should also
+            override this method.
+
+        Args:
+            transitions: A list of transition objects.
+            required_attrs: Required attributes. Could be an empty tuple if
+                no attribute is required.
+
+        Returns:
+            Positions where transitions are inserted.
+
+        Raises:
+            Same as :meth:`.Buffer.append`, if any transition object is
+            invalid, no transition object will be stored.
+        """
+        with self._lock:
+            schema = self._schema
+            checked_required_attrs = self._checked_required_attrs
+            try:
+                transitions = [self._prepare(tr, required_attrs) for tr in transitions]
+            except Exception:
+                # the schema may be set by a valid transition in the front of
+                # a rejected list, restore it since nothing is stored
+                self._schema = schema
+                self._checked_required_attrs = checked_required_attrs
+                raise
+            return self.buffer.store_many(transitions)
+
+    def _prepare(
+        self, transition: Union[TransitionBase, Dict], required_attrs
+    ) -> TransitionBase:
+        """
+        Convert and check a transition object before storing it.
         """
         if isinstance(transition, dict):
             transition = Transition(**transition)
@@ -68,15 +173,19 @@ class Buffer:
                 "Transition object must be a dict or an instance"
                 " of the Transition class"
             )
-        if not transition.has_keys(required_attrs):
-            missing_keys = set(required_attrs) - set(transition.keys())
-            raise ValueError(f"Transition object missing attributes: {missing_keys}")
-        transition.to(self.buffer_device)
-
-        if self.size() != 0 and self.buffer[0].keys() != transition.keys():
-            raise ValueError("Transition object has different attributes!")
-
-        return self.buffer.store(transition)
+        if (
+            self._schema is None
+            or required_attrs != self._checked_required_attrs
+            or (__debug__ and tuple(transition.keys()) != self._schema["keys"])
+        ):
+            self._check_keys(transition, required_attrs)
+            if self._schema is None:
+                self._schema = self.make_schema(transition)
+            self._checked_required_attrs = required_attrs
+        if self.buffer.columns is None:
+            # columns are copied into on the buffer device directly
+            transition.to(self.buffer_device)
+        return transition
 
     def size(self):
         """
@@ -89,7 +198,101 @@ class Buffer:
         """
         Remove all entries from the buffer
         """
-        self.buffer.clear()
+        with self._lock:
+            self.buffer.clear()
+            self._schema = None
+            self._checked_required_attrs = None
+
+    def _check_keys(self, transition: TransitionBase, required_attrs):
+        """
+        Check attributes of a transition object against required attributes
+        and the cached schema.
+
+        Raises:
+            ``ValueError`` if check failed.
+        """
+        if not transition.has_keys(required_attrs):
+            missing_keys = set(required_attrs) - set(transition.keys())
+            raise ValueError(f"Transition object missing attributes: {missing_keys}")
+        keys = tuple(transition.keys())
+        if self._schema is not None and keys != self._schema["keys"]:
+            raise ValueError("Transition object has different attributes!")
+
+    @staticmethod
+    def make_schema(transition: TransitionBase) -> Dict[str, Any]:
+        """
+        Make the attribute schema of a transition object, used to
+        post-process sampled batches without inspecting the first sample.
+
+        Args:
+            transition: A transition object.
+
+        Returns:
+            A dictionary with sets of major, sub, custom attribute names
+            under keys "major", "sub", "custom", a tuple of all attribute
+            names under key "keys", and a dictionary of tuples of keys of
+            each major attribute under key "sub_keys".
+        """
+        return {
+            "major": frozenset(transition.major_attr),
+            "sub": frozenset(transition.sub_attr),
+            "custom": frozenset(transition.custom_attr),
+            "keys": tuple(transition.keys()),
+            "sub_keys": {
+                ma: tuple(transition[ma].keys()) for ma in transition.major_attr
+            },
+        }
+
+    @staticmethod
+    def sample_index_random_unique(size: int, batch_size: int) -> Tuple[int, t.Tensor]:
+        """
+        Sample unique random positions from ``range(size)``.
+
+        Note:
+            Sampled size could be any value from 0 to ``batch_size``.
+
+        Note:
+            If ``batch_size`` is a large fraction of ``size``, positions are
+            taken from ``torch.randperm``, which draws from the torch random
+            number generator instead of the python one. Otherwise
+            ``random.sample`` is used, since ``randperm`` always permutes
+            the whole range and is much slower for small batches sampled
+            from large buffers.
+
+        Returns:
+            Sampled size, a long tensor of sampled positions.
+        """
+        real_num = min(size, batch_size)
+        if size <= real_num * 64:
+            return real_num, t.randperm(size)[:real_num]
+        index = random.sample(range(size), real_num)
+        return real_num, t.tensor(index, dtype=t.long)
+
+    @staticmethod
+    def sample_index_random(size: int, batch_size: int) -> Tuple[int, t.Tensor]:
+        """
+        Sample random positions from ``range(size)``, with replacement.
+
+        Note:
+            Sampled size could be any value from 0 to ``batch_size``.
+
+        Returns:
+            Sampled size, a long tensor of sampled positions.
+        """
+        if size == 0:
+            return 0, t.zeros([0], dtype=t.long)
+        return batch_size, t.randint(size, (batch_size,), dtype=t.long)
+
+    @staticmethod
+    def sample_index_all(size: int, _) -> Tuple[int, t.Tensor]:
+        """
+        Sample all positions from ``range(size)``, will ignore the
+        ``batch_size`` parameter.
+
+        Returns:
+            Sampled size, a long tensor of sampled positions.
+        """
+        return size, t.arange(size, dtype=t.long)
 
     @staticmethod
     def sample_method_random_unique(
@@ -100,14 +303,12 @@ class Buffer:
 
         Note:
             Sampled size could be any value from 0 to ``batch_size``.
+
+        See Also:
+            :meth:`.Buffer.sample_index_random_unique`
         """
-        if len(buffer) < batch_size:
-            batch = random.sample(buffer, len(buffer))
-            real_num = len(buffer)
-        else:
-            batch = random.sample(buffer, batch_size)
-            real_num = batch_size
-        return real_num, batch
+        real_num, index = Buffer.sample_index_random_unique(len(buffer), batch_size)
+        return real_num, [buffer[i] for i in index.tolist()]
 
     @staticmethod
     def sample_method_random(
@@ -118,10 +319,12 @@ class Buffer:
 
         Note:
             Sampled size could be any value from 0 to ``batch_size``.
+
+        See Also:
+            :meth:`.Buffer.sample_index_random`
         """
-        indexes = [random.randint(0, len(buffer) - 1) for _ in range(batch_size)]
-        batch = [buffer[i] for i in indexes]
-        return batch_size, batch
+        real_num, index = Buffer.sample_index_random(len(buffer), batch_size)
+        return real_num, [buffer[i] for i in index.tolist()]
 
     @staticmethod
     def sample_method_all(buffer: List[Transition], _) -> Tuple[int, List[Transition]]:
@@ -146,13 +349,17 @@ class Buffer:
         Sample a random batch from buffer.
 
         See Also:
-            Default sample methods are defined as static class methods.
+            Default sample methods are defined as static class methods,
+            they sample positions instead of transition objects.
 
-            :meth:`.Buffer.sample_method_random_unique`
+            :meth:`.Buffer.sample_index_random_unique`
 
-            :meth:`.Buffer.sample_method_random`
+            :meth:`.Buffer.sample_index_random`
 
-            :meth:`.Buffer.sample_method_all`
+            :meth:`.Buffer.sample_index_all`
+
+            If a subclass overrides ``sample_method_<name>``, or defines a
+            new one, it is used for ``sample_method="<name>"`` instead.
 
         Note:
             "Concatenation"
@@ -205,24 +412,115 @@ class Buffer:
                - For custom attributes, if they are not in
                  ``additional_concat_attrs``, then lists, otherwise tensors.
         """
+        sample_index = None
         if isinstance(sample_method, str):
-            if not hasattr(self, "sample_method_" + sample_method):
-                raise RuntimeError(
-                    f"Cannot find specified sample method: {sample_method}"
-                )
-            sample_method = getattr(self, "sample_method_" + sample_method)
-        batch_size, batch = sample_method(self.buffer, batch_size)
+            try:
+                sample_index = self._sample_methods[sample_method]
+            except KeyError:
+                sample_method = self._find_legacy_sample_method(sample_method)
+
+        batch = None
+        if sample_index is not None:
+            batch_size, index = sample_index(self.size(), batch_size)
+            index = index.to(self.buffer_device)
+        else:
+            batch_size, batch = sample_method(self.buffer, batch_size)
+            index = None
 
         if device is None:
             device = self.buffer_device
 
+        storage = None
+        if index is not None:
+            storage = self._column_storage()
+            # transition objects are only needed if some attributes
+            # cannot be gathered from columns
+            if not self._gather_only(concatenate, sample_attrs):
+                batch = [self.buffer[i] for i in index.tolist()]
+
         return (
             batch_size,
             self.post_process_batch(
-                batch, device, concatenate, sample_attrs, additional_concat_attrs
+                batch,
+                device,
+                concatenate,
+                sample_attrs,
+                additional_concat_attrs,
+                storage=storage,
+                index=index,
+                schema=self._schema,
             ),
         )
 
+    def sample_batch_async(self, *args, **kwargs) -> Future:
+        """
+        Sample a batch in a background thread, so that sampling and copying
+        the batch to the target device could overlap with other work, such
+        as updating networks with the previous batch.
+
+        Appending and clearing wait until the sampling thread has finished
+        the current sample.
+
+        Example::
+
+            future = buffer.sample_batch_async(32, device="cuda:0")
+            while training:
+                batch_size, batch = future.result()
+                # prefetch the next batch
+                future = buffer.sample_batch_async(32, device="cuda:0")
+                ...
+
+        Note:
+            Host to cuda copies can only be asynchronous if the buffer is
+            created with ``pin_memory=True``.
+
+        Args:
+            Same as :meth:`sample_batch` of this buffer.
+
+        Returns:
+            A future of the :meth:`sample_batch` result.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor.submit(self._locked_sample_batch, *args, **kwargs)
+
+    def _locked_sample_batch(self, *args, **kwargs):
+        with self._lock:
+            return self.sample_batch(*args, **kwargs)
+
+    def _find_legacy_sample_method(self, name: str) -> Callable:
+        """
+        Find a sample method working on transition lists, such as
+        ``sample_method_<name>`` defined by subclasses.
+        """
+        if not hasattr(self, "sample_method_" + name):
+            raise RuntimeError(f"Cannot find specified sample method: {name}")
+        return getattr(self, "sample_method_" + name)
+
+    def _column_storage(self) -> Union[TransitionStorageColumnar, None]:
+        """
+        Returns:
+            The storage if major and sub attributes could be gathered
+            from its columns, ``None`` otherwise.
+        """
+        if self._gather_columns and self.buffer.columns is not None:
+            return self.buffer
+        return None
+
+    def _gather_only(self, concatenate: bool, sample_attrs: List[str]) -> bool:
+        """
+        Whether all sampled attributes could be gathered from storage
+        columns, so that sampled transition objects are not needed.
+        """
+        if not concatenate or self._column_storage() is None or self._schema is None:
+            return False
+        custom_attr = self._schema["custom"]
+        if not custom_attr:
+            return True
+        if sample_attrs is None:
+            return False
+        return not any(attr == "*" or attr in custom_attr for attr in sample_attrs)
+
     @classmethod
     def post_process_batch(
         cls,
@@ -231,45 +529,80 @@ class Buffer:
         concatenate: bool,
         sample_attrs: List[str],
         additional_concat_attrs: List[str],
+        storage: TransitionStorageColumnar = None,
+        index: t.Tensor = None,
+        schema: Dict[str, Any] = None,
     ):
         """
         Post-process (concatenate) sampled batch.
+
+        If ``storage`` and ``index`` are given, major attributes and sub
+        attributes will be gathered from columns of the storage when
+        concatenating, instead of concatenating tensors in ``batch``.
+
+        If ``schema`` is not given, it will be made from the first sample,
+        see :meth:`.Buffer.make_schema`.
+
+        ``batch`` could be ``None`` if only major attributes and sub
+        attributes are sampled and concatenated, and ``storage``,
+        ``index`` and ``schema`` are given.
         """
         result = []
         used_keys = []
 
-        if len(batch) == 0:
+        if len(batch if batch is not None else index) == 0:
             return None
+        if schema is None:
+            schema = cls.make_schema(batch[0])
         if sample_attrs is None:
-            sample_attrs = batch[0].keys() if batch else []
+            sample_attrs = schema["keys"]
         if additional_concat_attrs is None:
             additional_concat_attrs = []
 
-        major_attr = set(batch[0].major_attr)
-        sub_attr = set(batch[0].sub_attr)
-        custom_attr = set(batch[0].custom_attr)
+        major_attr = schema["major"]
+        sub_attr = schema["sub"]
+        custom_attr = schema["custom"]
+        use_columns = concatenate and storage is not None
+        # pinned memory only helps host to cuda copies
+        pin_memory = _is_cuda(device)
         for attr in sample_attrs:
             if attr in major_attr:
                 tmp_dict = {}
-                for sub_k in batch[0][attr].keys():
-                    tmp_dict[sub_k] = cls.make_tensor_from_batch(
-                        [item[attr][sub_k].to(device) for item in batch],
-                        device,
-                        concatenate,
-                    )
+                for sub_k in schema["sub_keys"][attr]:
+                    if use_columns:
+                        tmp_dict[sub_k] = _to_device(
+                            storage.gather(index, attr, sub_k, pin_memory), device
+                        )
+                    else:
+                        values = [item[attr][sub_k] for item in batch]
+                        if not concatenate:
+                            # stored tensors may be views of storage rows,
+                            # which are overwritten when the ring wraps
+                            values = [v.to(device, copy=True) for v in values]
+                        tmp_dict[sub_k] = cls.make_tensor_from_batch(
+                            values, device, concatenate
+                        )
                 result.append(tmp_dict)
                 used_keys.append(attr)
             elif attr in sub_attr:
-                result.append(
-                    cls.make_tensor_from_batch(
-                        [item[attr] for item in batch], device, concatenate
+                if use_columns:
+                    result.append(
+                        _to_device(
+                            storage.gather(index, attr, pin_memory=pin_memory), device
+                        )
+                    )
+                else:
+                    values = [item[attr] for item in batch]
+                    if not concatenate:
+                        values = [v.clone() if t.is_tensor(v) else v for v in values]
+                    result.append(
+                        cls.make_tensor_from_batch(values, device, concatenate)
                     )
-                )
                 used_keys.append(attr)
             elif attr == "*":
                 # select custom keys
                 tmp_dict = {}
-                for remain_k in batch[0].keys():
+                for remain_k in schema["keys"]:
                     if (
                         remain_k not in major_attr
                         and remain_k not in sub_attr
@@ -317,16 +650,39 @@ class Buffer:
             item = batch[0]
             batch_size = len(batch)
             if t.is_tensor(item):
-                batch = [it.to(device) for it in batch]
-                return t.cat(batch, dim=0).to(device)
+                # concatenate where tensors are stored, then transfer once
+                return _to_device(t.cat(batch, dim=0), device)
             else:
                 try:
-                    return t.tensor(batch, device=device).view(batch_size, -1)
+                    if type(item) in (bool, int, float):
+                        # numpy converts a list of python scalars much faster
+                        # than torch, and infers the same result types
+                        array = np.array(batch)
+                        result = t.from_numpy(array).view(batch_size, -1)
+                        if array.dtype == np.float64:
+                            result = result.to(t.get_default_dtype())
+                    else:
+                        result = t.tensor(batch).view(batch_size, -1)
                 except Exception:
                     raise ValueError(f"Batch not concatenable: {batch}")
+                return _to_device(result, device)
         else:
             return batch
 
     def __reduce__(self):
-        # for pickling
-        return self.__class__, (self.buffer_size, self.buffer_device)
+        # for pickling, stored transitions are pickled as well
+        return (
+            self.__class__,
+            (self.buffer_size, self.buffer_device),
+            self.__getstate__(),
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # locks, threads and bound methods are created again by __init__
+        for key in ("_lock", "_executor", "_sample_methods"):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
@@ -1,6 +1,6 @@
 from typing import Union, Dict, List, Any, Callable
 from threading import RLock
-from ..transition import TransitionBase
+from ..transition import TransitionBase, TransitionStorageSmart
 from .buffer import Buffer
 from machin.parallel.distributed import RpcGroup
 import torch as t
@@ -42,6 +42,9 @@ class DistributedBuffer(Buffer):
             buffer_name: A unique name of your buffer.
         """
         super().__init__(buffer_size, "cpu")
+        # sampled transitions are sent to other processes, they must own
+        # their tensors instead of referring to rows of storage columns
+        self.buffer = TransitionStorageSmart(buffer_size)
         self.buffer_name = buffer_name
         self.group = group
 
@@ -65,7 +68,21 @@ class DistributedBuffer(Buffer):
     ):
         # DOC INHERITED
         with self.wr_lock:
-            super().append(transition, required_attrs=required_attrs)
+            return super().append(transition, required_attrs=required_attrs)
+
+    def append_many(
+        self,
+        transitions: List[Union[TransitionBase, Dict]],
+        required_attrs=("state", "action", "next_state", "reward", "terminal"),
+    ):
+        # DOC INHERITED
+        with self.wr_lock:
+            # go through append, so that subclasses converting transitions
+            # in append also work
+            return [
+                self.append(transition, required_attrs=required_attrs)
+                for transition in transitions
+            ]
 
     def clear(self):
         """
@@ -151,6 +168,11 @@ class DistributedBuffer(Buffer):
             ),
         )
 
+    def _locked_sample_batch(self, *args, **kwargs):
+        # local buffers are sampled by ``_sample_service`` under ``wr_lock``,
+        # holding the local lock across rpc calls would deadlock with append
+        return self.sample_batch(*args, **kwargs)
+
     def _size_service(self):  # pragma: no cover
         return self.size()
 
@@ -158,15 +180,19 @@ class DistributedBuffer(Buffer):
         self.clear()
 
     def _sample_service(self, batch_size, sample_method):  # pragma: no cover
+        sample_index = None
         if isinstance(sample_method, str):
-            if not hasattr(self, "sample_method_" + sample_method):
-                raise RuntimeError(
-                    f"Cannot find specified sample method: {sample_method}"
-                )
-            sample_method = getattr(self, "sample_method_" + sample_method)
+            try:
+                sample_index = self._sample_methods[sample_method]
+            except KeyError:
+                sample_method = self._find_legacy_sample_method(sample_method)
 
         # sample raw local batch from local buffer
         with self.wr_lock:
-            local_batch_size, local_batch = sample_method(self.buffer, batch_size)
+            if sample_index is not None:
+                local_batch_size, index = sample_index(len(self.buffer), batch_size)
+                local_batch = [self.buffer[i] for i in index.tolist()]
+            else:
+                local_batch_size, local_batch = sample_method(self.buffer, batch_size)
 
         return local_batch_size, local_batch
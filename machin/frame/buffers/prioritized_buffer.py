@@ -241,6 +241,7 @@ class PrioritizedBuffer(Buffer):
         beta=0.4,
         beta_increment_per_sampling=0.001,
         *_,
+        pin_memory=False,
         **__,
     ):
         """
@@ -262,8 +263,10 @@ class PrioritizedBuffer(Buffer):
                 :math:`w_j=(N \\cdot P(j))^{-\\beta}/max_i w_i`
             beta_increment_per_sampling:
                 Beta increase step size, will gradually increase ``beta`` to 1.
+            pin_memory: Whether to gather samples into pinned memory,
+                see :class:`.Buffer`.
         """
-        super().__init__(buffer_size, buffer_device)
+        super().__init__(buffer_size, buffer_device, pin_memory=pin_memory)
         self.epsilon = epsilon
         self.alpha = alpha
         self.beta = beta
@@ -290,12 +293,45 @@ class PrioritizedBuffer(Buffer):
             transition: A transition object.
             priority: Priority of transition.
             required_attrs: Required attributes.
+
+        Returns:
+            The position where transition is inserted.
+        """
+        with self._lock:
+            position = super().append(transition, required_attrs)
+            if priority is None:
+                # the initialization method used in the original essay
+                priority = self.wt_tree.get_leaf_max()
+            self.wt_tree.update_leaf(self._normalize_priority(priority), position)
+            return position
+
+    def append_many(
+        self,
+        transitions: List[Union[TransitionBase, Dict]],
+        priorities: Union[List[float], None] = None,
+        required_attrs=("state", "action", "next_state", "reward", "terminal"),
+    ):
         """
-        position = super().append(transition, required_attrs)
-        if priority is None:
-            # the initialization method used in the original essay
-            priority = self.wt_tree.get_leaf_max()
-        self.wt_tree.update_leaf(self._normalize_priority(priority), position)
+        Store a list of transition objects to buffer.
+
+        Args:
+            transitions: A list of transition objects.
+            priorities: Priorities of transitions, ``None`` means using
+                the current maximum priority for every transition.
+            required_attrs: Required attributes.
+
+        Returns:
+            Positions where transitions are inserted.
+        """
+        with self._lock:
+            positions = super().append_many(transitions, required_attrs)
+            if priorities is None:
+                priorities = [None] * len(positions)
+            for priority, position in zip(priorities, positions):
+                if priority is None:
+                    priority = self.wt_tree.get_leaf_max()
+                self.wt_tree.update_leaf(self._normalize_priority(priority), position)
+            return positions
 
     def size(self):
         """
@@ -308,9 +344,10 @@ class PrioritizedBuffer(Buffer):
         """
         Clear and resets the buffer to its initial state.
         """
-        self.buffer.clear()
-        self.wt_tree = WeightTree(self.buffer_size)
-        self.curr_beta = self.beta
+        with self._lock:
+            super().clear()
+            self.wt_tree = WeightTree(self.buffer_size)
+            self.curr_beta = self.beta
 
     def update_priority(self, priorities: np.ndarray, indexes: np.ndarray):
         """
@@ -321,7 +358,8 @@ class PrioritizedBuffer(Buffer):
             indexes: Indexes of samples, returned by :meth:`sample_batch`
         """
         priorities = self._normalize_priority(priorities)
-        self.wt_tree.update_leaf_batch(priorities, indexes)
+        with self._lock:
+            self.wt_tree.update_leaf_batch(priorities, indexes)
 
     def sample_batch(
         self,
@@ -383,7 +421,6 @@ class PrioritizedBuffer(Buffer):
         )
         index = self.wt_tree.find_leaf_index(rand_priority)
 
-        batch = [self.buffer[idx] for idx in index]
         priority = self.wt_tree.get_leaf_weight(index)
 
         # calculate importance sampling weight
@@ -397,7 +434,25 @@ class PrioritizedBuffer(Buffer):
         if device is None:
             device = self.buffer_device
 
+        column_index = None
+        batch = None
+        storage = self._column_storage()
+        if storage is not None:
+            # gather major and sub attributes from storage columns
+            column_index = t.as_tensor(
+                np.atleast_1d(index), dtype=t.long, device=self.buffer_device
+            )
+        if not self._gather_only(concatenate, sample_attrs):
+            batch = [self.buffer[idx] for idx in index]
+
         result = self.post_process_batch(
-            batch, device, concatenate, sample_attrs, additional_concat_attrs
+            batch,
+            device,
+            concatenate,
+            sample_attrs,
+            additional_concat_attrs,
+            storage=storage,
+            index=column_index,
+            schema=self._schema,
         )
-        return len(batch), result, index, is_weight
+        return len(index), result, index, is_weight
@@ -1,7 +1,7 @@
 from typing import Union, Dict, List, Any
 from threading import RLock
 from collections import OrderedDict
-from ..transition import TransitionBase
+from ..transition import TransitionBase, TransitionStorageSmart
 from .prioritized_buffer import PrioritizedBuffer
 from machin.parallel.distributed import RpcGroup
 import numpy as np
@@ -46,6 +46,9 @@ class DistributedPrioritizedBuffer(PrioritizedBuffer):
             group: Process group which holds this buffer.
         """
         super().__init__(buffer_size, "cpu")
+        # sampled transitions are sent to other processes, they must own
+        # their tensors instead of referring to rows of storage columns
+        self.buffer = TransitionStorageSmart(buffer_size)
         self.buffer_name = buffer_name
         self.buffer_version_table = np.zeros([buffer_size], dtype=np.uint64)
         self.group = group
@@ -86,6 +89,22 @@ class DistributedPrioritizedBuffer(PrioritizedBuffer):
             # increase the version counter to mark it as tainted
             # later priority update will ignore this position
             self.buffer_version_table[position] += 1
+            return position
+
+    def append_many(
+        self,
+        transitions: List[Union[TransitionBase, Dict]],
+        priorities: Union[List[float], None] = None,
+        required_attrs=("state", "action", "next_state", "reward", "terminal"),
+    ):
+        # DOC INHERITED
+        if priorities is None:
+            priorities = [None] * len(transitions)
+        with self.wr_lock:
+            return [
+                self.append(transition, priority, required_attrs)
+                for transition, priority in zip(transitions, priorities)
+            ]
 
     def size(self):
         """
@@ -212,6 +231,11 @@ class DistributedPrioritizedBuffer(PrioritizedBuffer):
         all_is_weight = np.concatenate(all_is_weight, axis=0)
         return all_batch_len, all_batch, all_index, all_is_weight
 
+    def _locked_sample_batch(self, *args, **kwargs):
+        # local buffers are sampled by ``_sample_service`` under ``wr_lock``,
+        # holding the local lock across rpc calls would deadlock with append
+        return self.sample_batch(*args, **kwargs)
+
     def _size_service(self):  # pragma: no cover
         with self.wr_lock:
             return super().size()
@@ -1,10 +1,13 @@
-from typing import Union, Dict, Iterable, Any, NewType
+from typing import Union, Dict, Iterable, Any, NewType, List
 from itertools import chain
-from copy import deepcopy
+from copy import copy, deepcopy
+from machin.utils.logging import default_logger
 import torch as t
 import numpy as np
 
 Scalar = NewType("Scalar", Union[int, float, bool])
+# scalar types which could be stored in storage columns
+_numeric_types = (bool, int, float, np.bool_, np.number)
 
 
 class TransitionBase:
@@ -294,6 +297,9 @@ class TransitionStorageBasic(list):
     and isolated from the passed in transition object.
     """
 
+    # row only storages do not have columns, see TransitionStorageColumnar
+    columns = None
+
     def __init__(self, max_size):
         """
         Args:
@@ -311,22 +317,42 @@ class TransitionStorageBasic(list):
         Returns:
             The position where transition is inserted.
         """
-        transition = deepcopy(transition)
-        if len(self) == self.max_size:
-            # ring buffer storage
-            position = self.index
-            self[self.index] = transition
-        elif len(self) < self.max_size:
+        return self._place(deepcopy(transition))
+
+    def store_many(self, transitions: List[TransitionBase]) -> List[int]:
+        """
+        Args:
+            transitions: Transition objects to be stored, in order.
+
+        Returns:
+            Positions where transitions are inserted.
+        """
+        return [self.store(transition) for transition in transitions]
+
+    def _place(self, transition: TransitionBase) -> int:
+        """
+        Put a transition into the next slot of the ring buffer, ``index``
+        always points to the slot which will be written next.
+
+        Args:
+            transition: Transition object to be placed, it will not be copied.
+
+        Returns:
+            The position where transition is inserted.
+        """
+        position = self.index
+        if position == len(self):
             # append if not full
             self.append(transition)
-            position = len(self) - 1
-        else:  # pragma: no cover
-            raise RuntimeError()
+        else:
+            # ring buffer storage
+            self[position] = transition
         self.index = (position + 1) % self.max_size
         return position
 
     def clear(self):
         super().clear()
+        self.index = 0
 
 
 class TransitionStorageSmart(TransitionStorageBasic):
@@ -377,20 +403,367 @@ class TransitionStorageSmart(TransitionStorageBasic):
             transition[sa] = deepcopy(transition[sa])
         for ca in transition.custom_attr:
             transition[ca] = deepcopy(transition[ca])
+        return self._place(transition)
 
-        # store transition
-        if len(self) == self.max_size:
-            # ring buffer storage
-            position = self.index
-            self[self.index] = transition
-        elif len(self) < self.max_size:
-            # append if not full
-            self.append(transition)
-            position = len(self) - 1
-        else:  # pragma: no cover
-            raise RuntimeError()
-        self.index = (position + 1) % self.max_size
+
+class TransitionStorageColumnar(TransitionStorageBasic):
+    """
+    TransitionStorageColumnar stores tensors of major attributes and sub
+    attributes in preallocated columns of shape ``[max_size, *data_shape]``,
+    one column per key, so that a batch could be gathered by a single
+    ``index_select`` per key instead of concatenating stored tensors one by
+    one. Scalar sub attributes are stored in columns of shape
+    ``[max_size, 1]``.
+
+    Stored transition objects are still kept, but their major and sub
+    attribute tensors are views of column rows, so no additional memory is
+    used. Custom attributes are deep copied.
+
+    Warnings:
+        Since rows are reused when the ring buffer wraps around, tensors of
+        a stored transition object will be overwritten by later stored
+        transitions. Clone them if you keep them around, samples returned
+        by :meth:`.Buffer.sample_batch` are already copies.
+
+    Columns are allocated when the first transition is stored. Scalar
+    columns are promoted if a scalar of another numeric type is stored,
+    E.g.: an integer reward column becomes a float column once a float
+    reward is stored. If a transition does not fit into the column layout
+    (different keys, shapes, dtypes or non numeric scalars), all columns
+    will be dropped with a warning and the storage will continue to work
+    like :class:`TransitionStorageBasic` until cleared.
+    """
+
+    def __init__(
+        self,
+        max_size,
+        device: Union[str, t.device] = "cpu",
+        pin_memory: bool = False,
+    ):
+        """
+        Args:
+            max_size: Maximum size of the transition storage.
+            device: Device where columns are allocated.
+            pin_memory: Whether to allow gathering into pinned memory,
+                only effective if ``device`` is "cpu" and cuda is available.
+        """
+        super().__init__(max_size)
+        self.device = device
+        self.pin_memory = (
+            pin_memory
+            and (device is None or t.device(device).type == "cpu")
+            and t.cuda.is_available()
+        )
+        self.columns = None
+        self._layout = None
+        self._scalar_types = None
+        self._columnar = True
+
+    def store(self, transition: TransitionBase) -> int:
+        # DOC INHERITED
+        if self._columnar and self.columns is None:
+            self._allocate(transition)
+        if self.columns is not None and not self._fits(transition):
+            self._drop_columns()
+        if self.columns is None:
+            return super().store(transition.to(self.device))
+        self._promote_scalars(transition)
+
+        # the passed in object must not refer to column rows
+        transition = copy(transition)
+        position = self._place(transition)
+        self._write(position, transition)
         return position
 
+    def store_many(self, transitions: List[TransitionBase]) -> List[int]:
+        # DOC INHERITED
+        if not transitions:
+            return []
+        if self._columnar and self.columns is None:
+            self._allocate(transitions[0])
+        if self.columns is None or not all(self._fits(tr) for tr in transitions):
+            return super().store_many(transitions)
+        for transition in transitions:
+            self._promote_scalars(transition)
+
+        transitions = [copy(transition) for transition in transitions]
+        positions = [self._place(transition) for transition in transitions]
+        # only the last max_size transitions will survive in the ring,
+        # their rows form at most two contiguous blocks in each column
+        kept = transitions[-self.max_size :]
+        start = positions[-len(kept)]
+        split = min(len(kept), self.max_size - start)
+        for ma in kept[0].major_attr:
+            for k, column in self.columns[ma].items():
+                block = t.stack([tr[ma][k].to(self.device) for tr in kept])
+                self._write_block(column, start, split, block)
+        for sa in kept[0].sub_attr:
+            column = self.columns[sa]
+            if sa in self._scalar_types:
+                block = t.tensor([tr[sa] for tr in kept], dtype=column.dtype)
+                block = block.view(-1, 1)
+            else:
+                block = t.stack([tr[sa].to(self.device) for tr in kept])
+            self._write_block(column, start, split, block)
+        for position, transition in zip(positions[-len(kept) :], kept):
+            self._bind(position, transition)
+            for ca in transition.custom_attr:
+                object.__setattr__(transition, ca, deepcopy(transition[ca]))
+        return positions
+
+    def gather(
+        self,
+        index: t.Tensor,
+        attr: str,
+        sub_key: str = None,
+        pin_memory: bool = False,
+    ) -> t.Tensor:
+        """
+        Gather rows of a column, the result is the same as concatenating
+        the corresponding tensors (or scalars) of stored transitions.
+
+        Args:
+            index: A long tensor of positions, on the column device.
+            attr: Name of the major or sub attribute.
+            sub_key: Key in the major attribute dictionary, ``None`` for
+                sub attributes.
+            pin_memory: Whether to gather into pinned memory, ignored
+                if pinning is not allowed by this storage.
+
+        Returns:
+            Gathered tensor.
+        """
+        if sub_key is None:
+            column = self.columns[attr]
+        else:
+            column = self.columns[attr][sub_key]
+        if pin_memory and self.pin_memory:
+            result = t.empty(
+                (index.shape[0],) + column.shape[1:],
+                dtype=column.dtype,
+                pin_memory=True,
+            )
+            t.index_select(column, 0, index, out=result)
+        else:
+            result = column.index_select(0, index)
+        if sub_key is None and attr in self._scalar_types:
+            return result
+        return result.flatten(0, 1)
+
     def clear(self):
         super().clear()
+        self.columns = None
+        self._layout = None
+        self._scalar_types = None
+        self._columnar = True
+
+    def __reduce__(self):
+        # for pickling, stored tensors are views of column rows and each of
+        # them would be pickled together with its whole column, so only
+        # columns are pickled, and stored transitions are bound to column
+        # rows again in __setstate__. Transitions are passed in the state
+        # instead of list items, since copy.deepcopy sets the state before
+        # appending list items, while pickle does the opposite.
+        state = self.__dict__.copy()
+        if self.columns is None:
+            state["transitions"] = list(self)
+            return self.__class__, (self.max_size,), state
+
+        size = len(self)
+        if size < self.max_size:
+            # do not pickle unused rows
+            state["columns"] = self._map_columns(lambda c: c[:size].clone())
+        transitions = []
+        for transition in self:
+            transition = copy(transition)
+            for ma in transition.major_attr:
+                object.__setattr__(transition, ma, dict.fromkeys(transition[ma]))
+            for sa in transition.sub_attr:
+                if sa not in self._scalar_types:
+                    object.__setattr__(transition, sa, None)
+            transitions.append(transition)
+        state["transitions"] = transitions
+        return self.__class__, (self.max_size,), state
+
+    def __setstate__(self, state):
+        state = state.copy()
+        self.extend(state.pop("transitions"))
+        self.__dict__.update(state)
+        if self.columns is None:
+            return
+
+        def restore(column):
+            if column.shape[0] == self.max_size:
+                return column
+            full = t.empty(
+                (self.max_size,) + column.shape[1:],
+                dtype=column.dtype,
+                device=column.device,
+            )
+            full[: column.shape[0]] = column
+            return full
+
+        self.columns = self._map_columns(restore)
+        for position, transition in enumerate(self):
+            self._bind(position, transition)
+
+    def _map_columns(self, func):
+        """
+        Apply ``func`` to every column, returns new columns.
+        """
+        return {
+            attr: (
+                {k: func(c) for k, c in column.items()}
+                if isinstance(column, dict)
+                else func(column)
+            )
+            for attr, column in self.columns.items()
+        }
+
+    def _allocate(self, transition: TransitionBase):
+        """
+        Allocate columns according to the layout of the given transition.
+        Disables columns if any sub attribute is not a tensor or a number.
+        """
+        columns = {}
+        layout = {}
+        scalar_types = {}
+        for ma in transition.major_attr:
+            columns[ma] = {}
+            layout[ma] = {}
+            for k, v in transition[ma].items():
+                columns[ma][k] = t.empty(
+                    (self.max_size,) + v.shape, dtype=v.dtype, device=self.device
+                )
+                layout[ma][k] = (v.shape, v.dtype)
+        for sa in transition.sub_attr:
+            v = transition[sa]
+            if t.is_tensor(v):
+                columns[sa] = t.empty(
+                    (self.max_size,) + v.shape, dtype=v.dtype, device=self.device
+                )
+                layout[sa] = (v.shape, v.dtype)
+            elif isinstance(v, _numeric_types):
+                # use the same dtype as concatenating scalars
+                dtype = t.tensor([v]).dtype
+                columns[sa] = t.empty(
+                    (self.max_size, 1), dtype=dtype, device=self.device
+                )
+                # python types of stored scalars
+                scalar_types[sa] = {type(v)}
+            else:
+                self._columnar = False
+                return
+        self.columns = columns
+        self._layout = layout
+        self._scalar_types = scalar_types
+
+    def _fits(self, transition: TransitionBase) -> bool:
+        """
+        Check whether the given transition fits into the column layout.
+        """
+        for ma in transition.major_attr:
+            ma_data = transition[ma]
+            ma_layout = self._layout.get(ma)
+            if ma_layout is None or len(ma_layout) != len(ma_data):
+                return False
+            for k, v in ma_data.items():
+                if (
+                    k not in ma_layout
+                    or v.shape != ma_layout[k][0]
+                    or v.dtype != ma_layout[k][1]
+                ):
+                    return False
+        for sa in transition.sub_attr:
+            v = transition[sa]
+            if sa in self._scalar_types:
+                if type(v) not in self._scalar_types[sa] and not isinstance(
+                    v, _numeric_types
+                ):
+                    return False
+            elif (
+                sa not in self._layout
+                or not t.is_tensor(v)
+                or v.shape != self._layout[sa][0]
+                or v.dtype != self._layout[sa][1]
+            ):
+                return False
+        return True
+
+    def _promote_scalars(self, transition: TransitionBase):
+        """
+        Promote dtypes of scalar columns if scalars of the transition have
+        types not stored before, to the same dtype as concatenating them.
+        """
+        for sa, types in self._scalar_types.items():
+            v = transition[sa]
+            if type(v) not in types:
+                column = self.columns[sa]
+                dtype = t.promote_types(column.dtype, t.tensor([v]).dtype)
+                if dtype != column.dtype:
+                    self.columns[sa] = column.to(dtype)
+                types.add(type(v))
+
+    def _write(self, position: int, transition: TransitionBase):
+        """
+        Copy data of the transition into column rows at ``position``, and
+        make the transition refer to these rows.
+        """
+        for ma in transition.major_attr:
+            columns = self.columns[ma]
+            for k, v in transition[ma].items():
+                columns[k][position].copy_(v)
+        for sa in transition.sub_attr:
+            if sa in self._scalar_types:
+                self.columns[sa][position, 0] = transition[sa]
+            else:
+                self.columns[sa][position].copy_(transition[sa])
+        self._bind(position, transition)
+        for ca in transition.custom_attr:
+            object.__setattr__(transition, ca, deepcopy(transition[ca]))
+
+    def _bind(self, position: int, transition: TransitionBase):
+        """
+        Make the transition refer to column rows at ``position``.
+        """
+        for ma in transition.major_attr:
+            columns = self.columns[ma]
+            object.__setattr__(
+                transition, ma, {k: columns[k][position] for k in transition[ma]}
+            )
+        for sa in transition.sub_attr:
+            if sa not in self._scalar_types:
+                object.__setattr__(transition, sa, self.columns[sa][position])
+
+    @staticmethod
+    def _write_block(column: t.Tensor, start: int, split: int, block: t.Tensor):
+        """
+        Copy consecutive rows into a column starting from ``start``, rows
+        after ``split`` wrap around to the beginning of the column.
+        """
+        column[start : start + split].copy_(block[:split])
+        if split < block.shape[0]:
+            column[: block.shape[0] - split].copy_(block[split:])
+
+    def _drop_columns(self):
+        """
+        Make stored transitions own their tensors and release all columns.
+        """
+        default_logger.warning(
+            "Transition object does not fit into storage columns, columns are "
+            "dropped and sampling will be slower until the storage is cleared."
+        )
+        for transition in self:
+            for ma in transition.major_attr:
+                object.__setattr__(
+                    transition,
+                    ma,
+                    {k: v.clone() for k, v in transition[ma].items()},
+                )
+            for sa in transition.sub_attr:
+                if sa not in self._scalar_types:
+                    object.__setattr__(transition, sa, transition[sa].clone())
+        self.columns = None
+        self._layout = None
+        self._scalar_types = None
+        self._columnar = False
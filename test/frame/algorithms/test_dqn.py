@@ -231,6 +231,26 @@ class TestDQN:
                 "terminal": False,
             }
         )
+        dqn.store_transition(
+            state={"state": old_state},
+            action={"action": action},
+            next_state={"state": state},
+            reward=0,
+            terminal=False,
+        )
+        assert dqn.replay_buffer.size() == 2
+        with pytest.raises(ValueError, match="not both"):
+            dqn.store_transition(
+                {
+                    "state": {"state": old_state},
+                    "action": {"action": action},
+                    "next_state": {"state": state},
+                    "reward": 0,
+                    "terminal": False,
+                },
+                reward=1,
+            )
+        assert dqn.replay_buffer.size() == 2
 
     def test_store_episode(self, train_config, dqn, dtype):
         c = train_config
@@ -259,13 +259,11 @@ class TestDQNPer:
                     total_reward += float(reward)
 
                     dqn_per_train.store_transition(
-                        {
-                            "state": {"state": old_state.unsqueeze(0)},
-                            "action": {"action": action},
-                            "next_state": {"state": state.unsqueeze(0)},
-                            "reward": float(reward),
-                            "terminal": terminal or step == c.max_steps,
-                        }
+                        state={"state": old_state.unsqueeze(0)},
+                        action={"action": action},
+                        next_state={"state": state.unsqueeze(0)},
+                        reward=float(reward),
+                        terminal=terminal or step == c.max_steps,
                     )
 
             # update
@@ -1,6 +1,7 @@
 from machin.frame.transition import Transition
 from machin.frame.buffers import Buffer
 
+from copy import deepcopy
 import dill
 import pytest
 import torch as t
@@ -97,6 +98,66 @@ class TestBuffer:
             for trans in trans_list:
                 buffer.append(trans, require_attr)
 
+    ########################################################################
+    # Test for Buffer.append_many
+    ########################################################################
+    @pytest.mark.parametrize("episode_length", [3, 10, 25])
+    def test_append_many(self, episode_length):
+        # storing episodes must be the same as appending transitions one
+        # by one, including wrapping around the end of the ring storage
+        def make_episode(offset):
+            return [
+                {
+                    "state": {"state_1": t.full([1, 2], offset + i)},
+                    "action": {"action_1": t.full([1, 3], offset + i)},
+                    "next_state": {"next_state_1": t.full([1, 2], offset + i + 1)},
+                    "reward": float(offset + i),
+                    "terminal": i == episode_length - 1,
+                    "data_index": offset + i,
+                }
+                for i in range(episode_length)
+            ]
+
+        buffer = Buffer(self.SAMPLE_BUFFER_SIZE)
+        seq_buffer = Buffer(self.SAMPLE_BUFFER_SIZE)
+        for offset in (0, 100, 200):
+            episode = make_episode(offset)
+            positions = buffer.append_many(episode)
+            assert positions == [seq_buffer.append(trans) for trans in episode]
+            assert buffer.buffer.columns is not None
+            assert buffer.size() == seq_buffer.size()
+            for trans, seq_trans in zip(buffer.buffer, seq_buffer.buffer):
+                assert self.t_eq(
+                    trans["state"]["state_1"], seq_trans["state"]["state_1"]
+                )
+                assert trans["reward"] == seq_trans["reward"]
+                assert trans["data_index"] == seq_trans["data_index"]
+            size = buffer.size()
+            assert self.t_eq(
+                buffer.buffer.columns["reward"][:size],
+                seq_buffer.buffer.columns["reward"][:size],
+            )
+
+        # an invalid transition must not leave part of the episode stored
+        size = buffer.size()
+        episode = make_episode(300)
+        del episode[-1]["data_index"]
+        with pytest.raises(ValueError, match="Transition object has different"):
+            buffer.append_many(episode)
+        assert buffer.size() == size
+
+        # nor fix the schema of an empty buffer to the rejected episode
+        buffer = Buffer(self.SAMPLE_BUFFER_SIZE)
+        with pytest.raises(ValueError, match="Transition object has different"):
+            buffer.append_many(episode)
+        assert buffer.size() == 0
+        episode = make_episode(400)
+        for trans in episode:
+            del trans["data_index"]
+        buffer.append(episode[0])
+        buffer.append_many(episode[1:])
+        assert buffer.size() == min(episode_length, self.SAMPLE_BUFFER_SIZE)
+
     ########################################################################
     # Test for Buffer.clear
     ########################################################################
@@ -319,9 +380,298 @@ class TestBuffer:
                             and isinstance(data[0], tuple)
                         )
 
+    @pytest.mark.parametrize("sample_method", ["random", "random_unique", "all"])
+    def test_sample_columns(self, sample_method):
+        # samples gathered from storage columns must be the same as
+        # concatenating the sampled transitions
+        buffer = Buffer(self.SAMPLE_BUFFER_SIZE)
+        for i in range(self.SAMPLE_BUFFER_SIZE + 3):
+            buffer.append(
+                {
+                    "state": {"state_1": t.full([1, 2], i)},
+                    "action": {"action_1": t.full([1, 3], i)},
+                    "next_state": {"next_state_1": t.full([1, 2], i + 1)},
+                    "reward": float(i),
+                    "terminal": i % 2 == 0,
+                }
+            )
+        assert buffer.buffer.columns is not None
+        bsize, (state, reward, terminal) = buffer.sample_batch(
+            5, sample_method=sample_method, sample_attrs=["state", "reward", "terminal"]
+        )
+        assert state["state_1"].shape == (bsize, 2)
+        assert reward.shape == (bsize, 1) and reward.dtype == t.float32
+        assert terminal.shape == (bsize, 1) and terminal.dtype == t.bool
+        # the sampled index is recovered from the stored state
+        batch = [buffer.buffer[int(i)] for i in state["state_1"][:, 0] % 10]
+        expected = Buffer.post_process_batch(
+            batch, "cpu", True, ["state", "reward", "terminal"], []
+        )
+        assert self.t_eq(state["state_1"], expected[0]["state_1"])
+        assert self.t_eq(reward, expected[1])
+        assert self.t_eq(terminal, expected[2])
+
+    def test_sample_not_concatenated_copies(self):
+        # stored tensors are views of storage rows, non concatenated
+        # samples must not change when the ring buffer wraps around
+        def make_transition(i):
+            return {
+                "state": {"state_1": t.full([1, 2], i)},
+                "action": {"action_1": t.full([1, 3], i)},
+                "next_state": {"next_state_1": t.full([1, 2], i)},
+                "reward": t.full([1, 1], float(i)),
+                "terminal": False,
+            }
+
+        buffer = Buffer(3)
+        buffer.append_many([make_transition(i) for i in range(3)], ())
+        _, (state, reward) = buffer.sample_batch(
+            3,
+            concatenate=False,
+            sample_method="all",
+            sample_attrs=["state", "reward"],
+        )
+        buffer.append_many([make_transition(i) for i in range(3, 6)], ())
+        assert [int(s[0, 0]) for s in state["state_1"]] == [0, 1, 2]
+        assert [int(r[0, 0]) for r in reward] == [0, 1, 2]
+
+    @staticmethod
+    def fill_pin_memory_buffer(buffer):
+        for i in range(5):
+            buffer.append(
+                {
+                    "state": {"state_1": t.full([1, 2], i)},
+                    "action": {"action_1": t.full([1, 3], i)},
+                    "next_state": {"next_state_1": t.full([1, 2], i + 1)},
+                    "reward": float(i),
+                    "terminal": i % 2 == 0,
+                }
+            )
+        return buffer
+
+    def test_pin_memory(self, pytestconfig):
+        dev = pytestconfig.getoption("gpu_device")
+        if dev is None or not dev.startswith("cuda"):
+            pytest.skip(f"Requiring GPU but provided `gpu_device` is {dev}")
+        pinned = self.fill_pin_memory_buffer(Buffer(10, "cpu", pin_memory=True))
+        unpinned = self.fill_pin_memory_buffer(Buffer(10, "cpu"))
+        assert pinned.buffer.pin_memory
+
+        attrs = ["state", "action", "reward", "terminal"]
+        _, pinned_batch = pinned.sample_batch(
+            10, device=dev, sample_method="all", sample_attrs=attrs
+        )
+        _, unpinned_batch = unpinned.sample_batch(
+            10, device=dev, sample_method="all", sample_attrs=attrs
+        )
+        t.cuda.synchronize(dev)
+        assert pinned_batch[0]["state_1"].device == t.device(dev)
+        assert self.t_eq(pinned_batch[0]["state_1"], unpinned_batch[0]["state_1"])
+        assert self.t_eq(pinned_batch[1]["action_1"], unpinned_batch[1]["action_1"])
+        assert self.t_eq(pinned_batch[2], unpinned_batch[2])
+        assert self.t_eq(pinned_batch[3], unpinned_batch[3])
+
+        index = t.tensor([4, 0, 2])
+        gathered = pinned.buffer.gather(index, "state", "state_1", pin_memory=True)
+        assert gathered.is_pinned()
+        assert self.t_eq(gathered, unpinned.buffer.gather(index, "state", "state_1"))
+
+        # pinning only makes sense for storages on cpu
+        buffer = self.fill_pin_memory_buffer(Buffer(10, dev, pin_memory=True))
+        assert not buffer.buffer.pin_memory
+
+    def test_pin_memory_disabled(self):
+        buffer = self.fill_pin_memory_buffer(Buffer(10, "cpu", pin_memory=True))
+        assert buffer.buffer.pin_memory == t.cuda.is_available()
+        if not t.cuda.is_available():
+            # gathering falls back to pageable memory
+            index = t.tensor([4, 0, 2])
+            gathered = buffer.buffer.gather(index, "state", "state_1", pin_memory=True)
+            assert self.t_eq(gathered, t.tensor([[4, 4], [0, 0], [2, 2]]))
+
+    def test_sample_async(self, const_buffer):
+        future = const_buffer.sample_batch_async(
+            5, sample_attrs=["state", "reward", "data_index"]
+        )
+        bsize, (state, reward, data_index) = future.result()
+        assert bsize == 5
+        assert state["state_1"].shape == (5, 2)
+        assert self.t_eq(reward, t.full([5, 1], 10))
+        assert isinstance(data_index, list) and len(data_index) == 5
+
+        with pytest.raises(RuntimeError, match="Cannot find specified sample method"):
+            const_buffer.sample_batch_async(
+                5, sample_method="some_invalid_method"
+            ).result()
+
+    def test_make_tensor_from_batch_override(self):
+        class CountingBuffer(Buffer):
+            calls = 0
+
+            @staticmethod
+            def make_tensor_from_batch(batch, device, concatenate):
+                CountingBuffer.calls += 1
+                return Buffer.make_tensor_from_batch(batch, device, concatenate)
+
+        buffer = CountingBuffer(self.SAMPLE_BUFFER_SIZE)
+        for i in range(3):
+            buffer.append(
+                {
+                    "state": {"state_1": t.full([1, 2], i)},
+                    "action": {"action_1": t.zeros([1, 3])},
+                    "next_state": {"next_state_1": t.zeros([1, 2])},
+                    "reward": float(i),
+                    "terminal": False,
+                }
+            )
+        bsize, (state, reward) = buffer.sample_batch(
+            3, sample_method="all", sample_attrs=["state", "reward"]
+        )
+        assert CountingBuffer.calls == 2
+        assert self.t_eq(state["state_1"], t.tensor([[0, 0], [1, 1], [2, 2]]))
+        assert self.t_eq(reward, t.tensor([[0.0], [1.0], [2.0]]))
+
+    def test_sample_method_override(self):
+        class FirstBuffer(Buffer):
+            @staticmethod
+            def sample_method_random(buffer, batch_size):
+                return 1, [buffer[0]]
+
+        buffer = FirstBuffer(self.SAMPLE_BUFFER_SIZE)
+        for i in range(3):
+            buffer.append(
+                {
+                    "state": {"state_1": t.full([1, 2], i)},
+                    "action": {"action_1": t.zeros([1, 3])},
+                    "next_state": {"next_state_1": t.zeros([1, 2])},
+                    "reward": float(i),
+                    "terminal": False,
+                }
+            )
+        bsize, (reward,) = buffer.sample_batch(
+            3, sample_method="random", sample_attrs=["reward"]
+        )
+        assert bsize == 1 and reward.tolist() == [[0.0]]
+
+    @pytest.mark.parametrize(
+        "size,batch_size,unique,should_be_size",
+        [
+            (0, 5, True, 0),
+            (3, 5, True, 3),
+            (10, 5, True, 5),
+            (1000, 5, True, 5),
+            (0, 5, False, 0),
+            (3, 5, False, 5),
+        ],
+    )
+    def test_sample_index(self, size, batch_size, unique, should_be_size):
+        if unique:
+            bsize, index = Buffer.sample_index_random_unique(size, batch_size)
+        else:
+            bsize, index = Buffer.sample_index_random(size, batch_size)
+        assert bsize == should_be_size
+        assert index.dtype == t.long and index.shape == (bsize,)
+        assert t.all((index >= 0) & (index < max(size, 1)))
+        if unique:
+            assert len(set(index.tolist())) == bsize
+
+        # legacy sample methods sample transition objects from lists
+        buffer = list(range(100, 100 + size))
+        sample_method = (
+            Buffer.sample_method_random_unique
+            if unique
+            else Buffer.sample_method_random
+        )
+        bsize, batch = sample_method(buffer, batch_size)
+        assert bsize == should_be_size == len(batch)
+        assert all(item in buffer for item in batch)
+
     ########################################################################
     # Test for Buffer.__reduce__
     ########################################################################
     def test_reduce(self, const_buffer):
         str = dill.dumps(const_buffer)
         buffer = dill.loads(str)
+        assert buffer.size() == const_buffer.size()
+        bsize, (state, data_index) = buffer.sample_batch(
+            5, sample_attrs=["state", "data_index"]
+        )
+        assert bsize == 5 and state["state_1"].shape == (5, 2)
+
+        # restored transitions refer to rows of restored columns
+        buffer.append(
+            {
+                "state": {"state_1": t.ones([1, 2])},
+                "action": {"action_1": t.zeros([1, 3])},
+                "next_state": {"next_state_1": t.zeros([1, 4])},
+                "reward": 10,
+                "terminal": True,
+                "data_index": 0,
+                "not_concatenable": (0, "some_str"),
+            }
+        )
+        position = buffer.buffer.index - 1
+        assert self.t_eq(buffer.buffer[position]["state"]["state_1"], t.ones([1, 2]))
+        assert self.t_eq(
+            buffer.buffer.columns["state"]["state_1"][position], t.ones([1, 2])
+        )
+        assert const_buffer.buffer[position]["state"]["state_1"].sum() == 0
+
+    def test_deepcopy(self, const_buffer):
+        buffer = deepcopy(const_buffer)
+        assert buffer.size() == const_buffer.size()
+        for trans, orig_trans in zip(buffer.buffer, const_buffer.buffer):
+            assert self.t_eq(trans["state"]["state_1"], orig_trans["state"]["state_1"])
+            assert trans["data_index"] == orig_trans["data_index"]
+        # copied transitions refer to rows of copied columns
+        assert (
+            buffer.buffer[1]["state"]["state_1"].data_ptr()
+            == buffer.buffer.columns["state"]["state_1"][1].data_ptr()
+        )
+        assert (
+            buffer.buffer.columns["state"]["state_1"].data_ptr()
+            != const_buffer.buffer.columns["state"]["state_1"].data_ptr()
+        )
+        bsize, (state,) = buffer.sample_batch(
+            5, concatenate=False, sample_attrs=["state"]
+        )
+        assert bsize == 5 and len(state["state_1"]) == 5
+
+        # partially filled buffers are copied as well
+        partial = Buffer(self.SAMPLE_BUFFER_SIZE)
+        for i in range(3):
+            partial.append(
+                {
+                    "state": {"state_1": t.full([1, 2], i)},
+                    "action": {"action_1": t.zeros([1, 3])},
+                    "next_state": {"next_state_1": t.zeros([1, 2])},
+                    "reward": float(i),
+                    "terminal": False,
+                }
+            )
+        partial = deepcopy(partial)
+        assert partial.size() == 3
+        assert self.t_eq(partial.buffer[1]["state"]["state_1"], t.full([1, 2], 1))
+
+    def test_reduce_partial(self):
+        # unused rows of columns are not pickled
+        buffer = Buffer(self.SAMPLE_BUFFER_SIZE)
+        for i in range(3):
+            buffer.append(
+                {
+                    "state": {"state_1": t.full([1, 2], i)},
+                    "action": {"action_1": t.zeros([1, 3])},
+                    "next_state": {"next_state_1": t.zeros([1, 2])},
+                    "reward": float(i),
+                    "terminal": False,
+                }
+            )
+        buffer = dill.loads(dill.dumps(buffer))
+        assert buffer.size() == 3
+        assert buffer.buffer.columns["state"]["state_1"].shape[0] == (
+            self.SAMPLE_BUFFER_SIZE
+        )
+        for i, trans in enumerate(buffer.buffer):
+            assert self.t_eq(trans["state"]["state_1"], t.full([1, 2], i))
+            assert trans["reward"] == float(i)
+        assert buffer.append_many([buffer.buffer[0]] * 8) == [3, 4, 5, 6, 7, 8, 9, 0]
@@ -48,6 +48,39 @@ class TestDistributedBuffer(WorldTestBase):
             assert t.all(sample[4]) and list(sample[4].shape) == [batch_size, 1]
         return True
 
+    ########################################################################
+    # Test for DistributedBuffer.sample_batch_async
+    ########################################################################
+    @staticmethod
+    @run_multi(expected_results=[True, True, True])
+    @WorldTestBase.setup_world
+    def test_append_sample_async(rank):
+        world = get_world()
+        data = {
+            "state": {"state_1": t.zeros([1, 2])},
+            "action": {"action_1": t.ones([1, 3])},
+            "next_state": {"next_state_1": t.zeros([1, 2])},
+            "reward": 1.5,
+            "terminal": True,
+        }
+        group = world.create_rpc_group("group", ["0", "1", "2"])
+        buffer = DistributedBuffer("buffer", group, 5)
+        if rank in (0, 1):
+            begin = time()
+            while time() - begin < 5:
+                buffer.append(data)
+                sleep(0.01)
+        else:
+            sleep(2)
+            for _ in range(10):
+                future = buffer.sample_batch_async(7)
+                # append to the local buffer while the sample is pending
+                buffer.append(data)
+                batch_size, sample = future.result()
+                assert batch_size > 0
+                assert t.all(sample[3] == 1.5)
+        return True
+
     ########################################################################
     # Test for DistributedBuffer.size and all_size
     ########################################################################
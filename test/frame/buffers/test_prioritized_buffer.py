@@ -1,5 +1,6 @@
 from machin.frame.buffers import WeightTree, PrioritizedBuffer
 
+from copy import deepcopy
 import pytest
 import numpy as np
 import torch as t
@@ -469,3 +470,63 @@ class TestPrioritizedBuffer:
             assert np.all(np.abs(is_weight - sampled_is_weight) < 1e-6)
         else:
             assert is_weight is None
+
+    def test_deepcopy(self):
+        buffer = PrioritizedBuffer(5, "cpu")
+        for i in range(3):
+            buffer.append(
+                {
+                    "state": {"state_1": t.full([1, 2], i)},
+                    "action": {"action_1": t.zeros([1, 3])},
+                    "next_state": {"next_state_1": t.zeros([1, 2])},
+                    "reward": float(i),
+                    "terminal": False,
+                },
+                priority=float(i + 1),
+            )
+        copied = deepcopy(buffer)
+        assert copied.size() == 3
+        assert np.all(
+            copied.wt_tree.get_leaf_all_weights()
+            == buffer.wt_tree.get_leaf_all_weights()
+        )
+        for i, trans in enumerate(copied.buffer):
+            assert t.equal(trans["state"]["state_1"], t.full([1, 2], i))
+        bsize, (state,), _, _ = copied.sample_batch(
+            2, concatenate=False, sample_attrs=["state"]
+        )
+        assert bsize == 2 and len(state["state_1"]) == 2
+
+    def test_pin_memory(self, pytestconfig):
+        dev = pytestconfig.getoption("gpu_device")
+        if dev is None or not dev.startswith("cuda"):
+            pytest.skip(f"Requiring GPU but provided `gpu_device` is {dev}")
+        buffers = [
+            PrioritizedBuffer(10, "cpu", pin_memory=True),
+            PrioritizedBuffer(10, "cpu"),
+        ]
+        assert buffers[0].buffer.pin_memory
+        results = []
+        for buffer in buffers:
+            for i in range(5):
+                buffer.append(
+                    {
+                        "state": {"state_1": t.full([1, 2], i)},
+                        "action": {"action_1": t.full([1, 3], i)},
+                        "next_state": {"next_state_1": t.full([1, 2], i + 1)},
+                        "reward": float(i),
+                        "terminal": False,
+                    },
+                    priority=float(i + 1),
+                )
+            # same seed, same sampled index
+            np.random.seed(0)
+            results.append(
+                buffer.sample_batch(5, device=dev, sample_attrs=["state", "reward"])
+            )
+        t.cuda.synchronize(dev)
+        (_, pinned, pinned_index, _), (_, unpinned, unpinned_index, _) = results
+        assert np.all(pinned_index == unpinned_index)
+        assert pinned[0]["state_1"].device == t.device(dev)
+        assert t.equal(pinned[0]["state_1"], unpinned[0]["state_1"])
+        assert t.equal(pinned[1], unpinned[1])
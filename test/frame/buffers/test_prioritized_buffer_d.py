@@ -171,6 +171,33 @@ class TestDistributedPrioritizedBuffer(WorldTestBase):
             buffer.update_priority(priorities, indexes)
         return True
 
+    # p2 appends to its local buffer while its async sample is pending
+    @staticmethod
+    @run_multi(expected_results=[True, True, True], args_list=[(full_trans_list,)] * 3)
+    @WorldTestBase.setup_world
+    def test_append_sample_async(rank, trans_list):
+        world = get_world()
+        default_logger.info(f"{rank} started")
+        np.random.seed(0)
+        group = world.create_rpc_group("group", ["0", "1", "2"])
+        buffer = DistributedPrioritizedBuffer("buffer", group, 5)
+        if rank in (0, 1):
+            begin = time()
+            while time() - begin < 5:
+                trans, prior = random.choice(trans_list)
+                buffer.append(trans, prior)
+                sleep(0.01)
+        else:
+            sleep(2)
+            for _ in range(10):
+                future = buffer.sample_batch_async(10, sample_attrs=["index"])
+                trans, prior = random.choice(trans_list)
+                buffer.append(trans, prior)
+                batch_size, sample, indexes, priorities = future.result()
+                assert batch_size > 0
+                assert len(sample) == 1
+        return True
+
     # sample from two empty buffers
     @staticmethod
     @run_multi(expected_results=[True, True, True])
@@ -1,4 +1,9 @@
-from machin.frame.transition import TransitionBase, Transition
+from machin.frame.transition import (
+    TransitionBase,
+    Transition,
+    TransitionStorageColumnar,
+)
+from machin.utils.logging import default_logger
 
 import pytest
 import torch as t
@@ -282,3 +287,64 @@ class TestTransition:
         else:
             tb = Transition(**trans)
             tb.to(pytestconfig.getoption("gpu_device"))
+
+
+class TestTransitionStorageColumnar:
+    @staticmethod
+    def make_transition(i, reward=1):
+        return Transition(
+            state={"state_1": t.full([1, 2], i)},
+            action={"action_1": t.full([1, 3], i)},
+            next_state={"next_state_1": t.full([1, 2], i + 1)},
+            reward=reward,
+            terminal=False,
+            data_index=i,
+        )
+
+    def test_store(self):
+        storage = TransitionStorageColumnar(3)
+        positions = [storage.store(self.make_transition(i)) for i in range(5)]
+        assert positions == [0, 1, 2, 0, 1]
+        assert len(storage) == 3
+        assert [tr["data_index"] for tr in storage] == [3, 4, 2]
+        # stored tensors are rows of columns
+        assert t.all(storage.columns["state"]["state_1"][0] == 3)
+        assert t.all(storage[0]["state"]["state_1"] == 3)
+
+    def test_gather(self):
+        storage = TransitionStorageColumnar(3)
+        for i in range(3):
+            storage.store(self.make_transition(i))
+        index = t.tensor([2, 0])
+        state = storage.gather(index, "state", "state_1")
+        assert state.shape == (2, 2)
+        assert t.all(state == t.tensor([[2, 2], [0, 0]]))
+        reward = storage.gather(index, "reward")
+        assert reward.shape == (2, 1) and reward.dtype == t.long
+
+    def test_promote_scalars(self):
+        storage = TransitionStorageColumnar(3)
+        storage.store(self.make_transition(0))
+        # a float reward promotes the long reward column
+        storage.store(self.make_transition(1, reward=0.5))
+        storage.store_many([self.make_transition(2, reward=True)])
+        assert storage.columns is not None
+        reward = storage.gather(t.tensor([0, 1, 2]), "reward")
+        assert reward.dtype == t.get_default_dtype()
+        assert reward.flatten().tolist() == [1.0, 0.5, 1.0]
+        assert storage[0]["reward"] == 1 and storage[1]["reward"] == 0.5
+
+    def test_drop_columns(self, monkeypatch):
+        warnings = []
+        monkeypatch.setattr(default_logger, "warning", warnings.append)
+        storage = TransitionStorageColumnar(3)
+        storage.store(self.make_transition(0))
+        # a non numeric reward does not fit into the reward column
+        storage.store(self.make_transition(1, reward="some_str"))
+        assert storage.columns is None
+        assert len(warnings) == 1 and "columns are dropped" in warnings[0]
+        assert t.all(storage[0]["state"]["state_1"] == 0)
+        assert storage[1]["reward"] == "some_str"
+        storage.clear()
+        storage.store(self.make_transition(0, reward=0.5))
+        assert storage.columns is not None